@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Memory stress test for the in-memory household state (state.py).
+
+Usage:
+    python bench_state.py [--households 50000] [--items 10]
+
+Fills one StateCache, as a single worker would hold it, with synthetic
+households: the default product catalogue plus a number of shopping items
+each. It reports the memory traced while filling it and the time taken to
+serve cached GET /products and GET /shopping responses. No database is
+needed. The figures in the state.py docstring come from this script.
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Tuple
+
+from default_products import DEFAULT_PRODUCTS
+from state import ItemRecord, ProductColumns, StateCache
+
+
+def fill(cache: StateCache, households: int, items: int):
+    created = datetime(2024, 1, 1)
+    product_id = item_id = 1
+    for household_id in range(1, households + 1):
+        products = [
+            SimpleNamespace(
+                id=product_id + i, name=name, sort_order=i + 1,
+                is_new=False, created_at=created,
+            )
+            for i, name in enumerate(DEFAULT_PRODUCTS)
+        ]
+        product_id += len(products)
+        rows = [
+            SimpleNamespace(
+                id=item_id + i, product_id=products[i % len(products)].id,
+                custom_name=None, quantity=None, note=None, is_checked=False,
+                sort_order=None, created_at=created + timedelta(seconds=i),
+            )
+            for i in range(items)
+        ]
+        item_id += items
+        cache._load(household_id, 0, "products", lambda: ProductColumns(products))
+        cache._load(household_id, 0, "items", lambda: [ItemRecord(row) for row in rows])
+
+
+def measure(households: int, items: int) -> Tuple[int, StateCache]:
+    cache = StateCache(idle_seconds=10 ** 9, max_households=households)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fill(cache, households, items)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory of the in-memory household state")
+    parser.add_argument(
+        "--households", "-n",
+        type=int,
+        default=50000,
+        help="Number of resident households"
+    )
+    parser.add_argument(
+        "--items", "-i",
+        type=int,
+        default=10,
+        help="Shopping items per household"
+    )
+    args = parser.parse_args()
+
+    n = args.households
+    products_only, _ = measure(n, 0)
+    total, cache = measure(n, args.items)
+    per_household = total / n
+    per_item = (total - products_only) / (n * args.items) if args.items else 0
+
+    print(f"{n} households, {len(DEFAULT_PRODUCTS)} products and {args.items} items each")
+    print(f"  products  {products_only / n:8.0f} B per household "
+          f"({products_only / (n * len(DEFAULT_PRODUCTS)):.0f} B per product)")
+    print(f"  items     {per_item:8.0f} B per item")
+    print(f"  total     {per_household:8.0f} B per household, {total / 1e6:.0f} MB")
+
+    # Every household is resident, so no database session is needed.
+    db = None
+    for name, serve in (("products", cache.products), ("shopping", cache.shopping)):
+        started = time.perf_counter()
+        for household_id in range(1, n + 1):
+            serve(db, household_id, 0)
+        elapsed = time.perf_counter() - started
+        print(f"  GET /{name:<9} {elapsed / n * 1e6:6.0f} us per cached response")
+    print(f"  cache     {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,15 @@ CLI script to create a new household.
 
 Usage:
     python create_household.py [--name "Family Name"] [--key "custom-key"] [--url "https://example.com"]
+    python create_household.py export HOUSEHOLD_ID [--output household.ndjson]
+    python create_household.py import household.ndjson [--new-key]
 
 If --key is not provided, a random key will be generated.
 If --url is provided, a shareable login link will be generated.
+
+export streams the household's data as NDJSON (stdout by default); import
+reads such a file ("-" for stdin) into a new household. Use --new-key to
+clone a household into an instance that already has the original.
 """
 
 import argparse
@@ -16,13 +22,11 @@ import hashlib
 import sys
 from urllib.parse import urlencode
 
-from sqlalchemy.orm import Session
-from database import engine
-from models import Household, Product, Base
+import shards
+from database import shard_engines
 from default_products import DEFAULT_PRODUCTS
-
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
+from migrate import check_schema_version
+from transfer import export_household
 
 
 def generate_key(length: int = 12) -> str:
@@ -41,37 +45,36 @@ def create_household(name=None, key=None):
     if key is None:
         key = generate_key()
 
-    key_hash = hash_key(key)
+    household_id = shards.create_household(name, hash_key(key), DEFAULT_PRODUCTS)
 
-    with Session(engine) as db:
-        # Check if key already exists
-        existing = db.query(Household).filter(
-            Household.access_key_hash == key_hash
-        ).first()
-        if existing:
-            raise ValueError("A household with this access key already exists")
+    return household_id, key
 
-        household = Household(
-            access_key_hash=key_hash,
-            name=name
-        )
-        db.add(household)
-        db.commit()
-        db.refresh(household)
 
-        # Add default products
-        for idx, product_name in enumerate(DEFAULT_PRODUCTS, start=1):
-            product = Product(
-                household_id=household.id,
-                name=product_name,
-                sort_order=idx,
-                is_new=False
-            )
-            db.add(product)
+def export_command(args):
+    entry = shards.get_entry(args.household_id)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for line in export_household(shard_engines[entry.shard], entry.id):
+            out.write(line)
+    finally:
+        if args.output:
+            out.close()
 
-        db.commit()
 
-        return household.id, key
+def import_command(args):
+    key = generate_key() if args.new_key else None
+    src = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    try:
+        household_id = shards.import_household(
+            src, access_key_hash=hash_key(key) if key else None
+        )
+    finally:
+        if src is not sys.stdin:
+            src.close()
+
+    print(f"Imported household with ID: {household_id}", file=sys.stderr)
+    if key:
+        print(f"New Access Key: {key}", file=sys.stderr)
 
 
 def main():
@@ -92,9 +95,42 @@ def main():
         help="Base URL of the application (optional, generates a shareable link)"
     )
 
+    subparsers = parser.add_subparsers(dest="command")
+
+    export_parser = subparsers.add_parser("export", help="Export a household as NDJSON")
+    export_parser.add_argument("household_id", type=int, help="ID of the household")
+    export_parser.add_argument(
+        "--output", "-o",
+        type=str,
+        help="Output file (optional, stdout if not provided)"
+    )
+    export_parser.set_defaults(func=export_command)
+
+    import_parser = subparsers.add_parser("import", help="Import a household from NDJSON")
+    import_parser.add_argument("file", type=str, help="Export file, or - for stdin")
+    import_parser.add_argument(
+        "--new-key",
+        action="store_true",
+        help="Generate a new access key instead of keeping the exported one"
+    )
+    import_parser.set_defaults(func=import_command)
+
     args = parser.parse_args()
 
+    if args.command:
+        try:
+            check_schema_version()
+            args.func(args)
+        except (ValueError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"Database error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
     try:
+        check_schema_version()
         household_id, access_key = create_household(name=args.name, key=args.key)
 
         print("\n" + "=" * 50)
@@ -119,7 +155,7 @@ def main():
         print("They will use it to log in to the app.")
         print()
 
-    except ValueError as e:
+    except (ValueError, RuntimeError) as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
@@ -3,9 +3,18 @@ from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from config import settings
 
+# The primary database holds the household directory and is also shard 0.
 engine = create_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+shard_engines = [engine] + [
+    create_engine(url, pool_pre_ping=True) for url in settings.shard_urls
+]
+shard_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    for shard_engine in shard_engines
+]
+
 
 class Base(DeclarativeBase):
     pass
@@ -0,0 +1,130 @@
+"""Purchase history and the per-household frequency rollups built from it."""
+
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models import Product, ShoppingItem, PurchaseHistory, ProductStats
+
+# A product is suggested once this fraction of its usual interval has passed.
+DUE_RATIO = 0.8
+
+
+def record_purchases(db: Session, household_id: int, items: List[ShoppingItem]):
+    """Append checked items to history and bump their rollups.
+
+    Runs inside the caller's transaction, so history and rollups are only
+    written if the clear that triggered them is committed.
+    """
+    purchased = [item for item in items if item.is_checked]
+    if not purchased:
+        return
+
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(PurchaseHistory, [
+        {
+            "household_id": household_id,
+            "product_id": item.product_id,
+            "name": item.product.name if item.product else item.custom_name or "",
+            "purchased_at": now,
+        }
+        for item in purchased
+    ])
+
+    product_ids = {item.product_id for item in purchased if item.product_id}
+    if not product_ids:
+        return
+
+    existing = {
+        product_id for (product_id,) in db.query(ProductStats.product_id).filter(
+            ProductStats.household_id == household_id,
+            ProductStats.product_id.in_(product_ids)
+        )
+    }
+    if existing:
+        # Incremented in the database, not read-modify-write in Python.
+        db.query(ProductStats).filter(
+            ProductStats.household_id == household_id,
+            ProductStats.product_id.in_(existing)
+        ).update({
+            ProductStats.purchase_count: ProductStats.purchase_count + 1,
+            ProductStats.last_purchased_at: now,
+        }, synchronize_session=False)
+
+    db.add_all(
+        ProductStats(
+            household_id=household_id,
+            product_id=product_id,
+            purchase_count=1,
+            first_purchased_at=now,
+            last_purchased_at=now,
+        )
+        for product_id in product_ids - existing
+    )
+
+
+def get_suggestions(db: Session, household_id: int, limit: int = 10) -> List[dict]:
+    """Products that are due to be bought again and are not on the list yet.
+
+    Reads only the household's rollups (at most one row per product),
+    never the history table.
+    """
+    on_list = select(ShoppingItem.product_id).where(
+        ShoppingItem.household_id == household_id,
+        ShoppingItem.product_id.isnot(None)
+    )
+    rows = db.query(ProductStats, Product).join(
+        Product, Product.id == ProductStats.product_id
+    ).filter(
+        ProductStats.household_id == household_id,
+        ProductStats.purchase_count > 1,
+        ProductStats.product_id.notin_(on_list)
+    ).all()
+
+    now = datetime.utcnow()
+    scored = []
+    for stats, product in rows:
+        span = (stats.last_purchased_at - stats.first_purchased_at).total_seconds()
+        interval = span / (stats.purchase_count - 1)
+        if interval <= 0:
+            continue
+        ratio = (now - stats.last_purchased_at).total_seconds() / interval
+        if ratio >= DUE_RATIO:
+            scored.append((ratio, stats, product))
+
+    scored.sort(key=lambda entry: (-entry[0], -entry[1].purchase_count))
+    return [
+        {
+            "id": product.id,
+            "name": product.name,
+            "sort_order": product.sort_order,
+            "purchase_count": stats.purchase_count,
+            "last_purchased_at": stats.last_purchased_at,
+        }
+        for _, stats, product in scored[:limit]
+    ]
+
+
+def compact_history(db: Session, retention_days: int, chunk_size: int = 5000) -> int:
+    """Delete history older than the retention window in small batches.
+
+    Rollups already hold everything suggestions need, so old rows can be
+    dropped without touching them. Returns the number of rows removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = db.execute(
+            select(PurchaseHistory.id)
+            .where(PurchaseHistory.purchased_at < cutoff)
+            .order_by(PurchaseHistory.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.execute(delete(PurchaseHistory).where(PurchaseHistory.id.in_(ids)))
+        db.commit()
+        removed += len(ids)
+    return removed
@@ -1,13 +1,63 @@
+import time
+
+# Measured from here so the startup log includes import time.
+boot_started = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import engine, Base
-from routes import auth, products, shopping, sse
+from config import settings
+from middleware import CompressionMiddleware, CacheControlMiddleware
+from ratelimit import RateLimitMiddleware, stats as limit_stats
+from state import cache as state_cache
+from migrate import check_schema_version
+from profiler import profiler
+from routes import admin, auth, household, products, shopping, sse
+from routes.sse import dispatcher
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied by `python migrate.py` at deploy time;
+    # workers only verify the stored version, a single cheap query.
+    check_started = time.perf_counter()
+    check_schema_version()
+    await dispatcher.start()
+    now = time.perf_counter()
+    logger.info(
+        "Startup finished in %.1f ms (schema check %.1f ms)",
+        (now - boot_started) * 1000,
+        (now - check_started) * 1000,
+    )
+    if settings.profile_on_startup:
+        profiler.start(
+            app.routes,
+            duration=settings.profile_duration_seconds,
+            interval=settings.profile_interval_ms / 1000,
+            output_dir=settings.profile_output_dir,
+        )
+    yield
+    await dispatcher.stop()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Zakupomat API")
+app = FastAPI(title="Zakupomat API", lifespan=lifespan)
+
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        read_per_second=settings.rate_limit_read_per_second,
+        read_burst=settings.rate_limit_read_burst,
+        write_per_second=settings.rate_limit_write_per_second,
+        write_burst=settings.rate_limit_write_burst,
+        sse_per_second=settings.rate_limit_sse_per_second,
+        sse_burst=settings.rate_limit_sse_burst,
+        max_in_flight=settings.max_in_flight_requests,
+    )
 
 # CORS - allow all origins in development
 app.add_middleware(
@@ -18,13 +68,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CacheControlMiddleware)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_enabled=settings.compression_brotli_enabled,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(products.router, prefix="/api")
 app.include_router(shopping.router, prefix="/api")
 app.include_router(sse.router, prefix="/api")
+app.include_router(household.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics")
+def metrics():
+    return {
+        "events": dispatcher.stats(),
+        "state": state_cache.stats(),
+        "limits": {
+            **limit_stats,
+            "config": {
+                "enabled": settings.rate_limit_enabled,
+                "read": [settings.rate_limit_read_per_second, settings.rate_limit_read_burst],
+                "write": [settings.rate_limit_write_per_second, settings.rate_limit_write_burst],
+                "sse": [settings.rate_limit_sse_per_second, settings.rate_limit_sse_burst],
+                "sse_max_streams_per_household": settings.sse_max_streams_per_household,
+                "max_in_flight_requests": settings.max_in_flight_requests,
+            },
+        },
+    }
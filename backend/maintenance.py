@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+CLI script for periodic maintenance jobs.
+
+Usage:
+    python maintenance.py compact-history [--days 365] [--chunk-size 5000]
+    python maintenance.py shards
+    python maintenance.py move-household HOUSEHOLD_ID SHARD [--grace 2]
+    python maintenance.py purge-inactive [--days 180] [--batch-size 100] [--pause 0.5] [--dry-run]
+
+compact-history removes purchase history older than the retention window
+(HISTORY_RETENTION_DAYS by default) on every shard. Suggestions are served
+from the product_stats rollups, so they are not affected. Suitable for a
+daily cron.
+
+shards prints the number of households per shard. move-household moves a
+household to another shard while the app is running; its writes get 503 +
+Retry-After for the few seconds it takes. Products and list items get new
+ids on the target shard, so clients have to refetch their lists (the
+frontend does so after the first rejected change).
+
+purge-inactive deletes households that have not been used for
+INACTIVE_HOUSEHOLD_DAYS (last_active_at in the directory, refreshed at most
+hourly by requests), together with shard data left behind by interrupted
+moves or purges. It works in small batches of bulk deletes with a pause
+between them; run it with --dry-run first to see what would go.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy.orm import Session
+
+import shards
+from config import settings
+from database import shard_engines
+from history import compact_history
+from migrate import check_schema_version
+
+
+def cmd_compact_history(args):
+    for shard, bind in enumerate(shard_engines):
+        with Session(bind) as db:
+            removed = compact_history(db, args.days, args.chunk_size)
+        print(f"Shard {shard}: removed {removed} history rows older than {args.days} days.")
+
+
+def cmd_shards(args):
+    for shard, count in shards.shard_counts().items():
+        print(f"Shard {shard}: {count} households")
+
+
+def cmd_move_household(args):
+    shards.move_household(args.household_id, args.shard, grace_seconds=args.grace)
+
+
+def _print_report(label: str, report, dry_run: bool):
+    for shard, counts in report.items():
+        households = counts.pop("household", 0)
+        line = f"Shard {shard}: {households} {label} households"
+        if dry_run and households:
+            line += " (" + ", ".join(f"{count} {name} rows" for name, count in counts.items()) + ")"
+        print(line)
+
+
+def cmd_purge_inactive(args):
+    verb = "would be removed" if args.dry_run else "removed"
+    print(f"Households inactive for more than {args.days} days, {verb}:")
+    _print_report("inactive", shards.purge_inactive(
+        args.days, args.batch_size, args.pause, args.dry_run
+    ), args.dry_run)
+    print(f"Shard data without a directory entry, {verb}:")
+    _print_report("orphaned", shards.purge_orphans(
+        args.batch_size, args.pause, args.dry_run
+    ), args.dry_run)
+    if args.dry_run:
+        print("Dry run, nothing was deleted.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run maintenance jobs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact = subparsers.add_parser(
+        "compact-history",
+        help="Delete purchase history older than the retention window"
+    )
+    compact.add_argument(
+        "--days", "-d",
+        type=int,
+        default=settings.history_retention_days,
+        help="Retention window in days"
+    )
+    compact.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="Rows deleted per transaction"
+    )
+    compact.set_defaults(func=cmd_compact_history)
+
+    status = subparsers.add_parser("shards", help="Show households per shard")
+    status.set_defaults(func=cmd_shards)
+
+    move = subparsers.add_parser("move-household", help="Move a household to another shard")
+    move.add_argument("household_id", type=int, help="ID of the household")
+    move.add_argument("shard", type=int, help="Target shard number")
+    move.add_argument(
+        "--grace",
+        type=float,
+        default=2.0,
+        help="Seconds to wait for in-flight writes before copying"
+    )
+    move.set_defaults(func=cmd_move_household)
+
+    purge = subparsers.add_parser(
+        "purge-inactive",
+        help="Delete households unused for a long time and orphaned shard data"
+    )
+    purge.add_argument(
+        "--days", "-d",
+        type=int,
+        default=settings.inactive_household_days,
+        help="Inactivity window in days"
+    )
+    purge.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Households deleted per transaction"
+    )
+    purge.add_argument(
+        "--pause",
+        type=float,
+        default=0.5,
+        help="Seconds to wait between batches"
+    )
+    purge.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be deleted"
+    )
+    purge.set_defaults(func=cmd_purge_inactive)
+
+    args = parser.parse_args()
+
+    try:
+        check_schema_version()
+        args.func(args)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
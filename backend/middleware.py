@@ -0,0 +1,189 @@
+"""ASGI middleware for response compression and API cache headers."""
+
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used when it is missing
+    brotli = None
+
+# Streams must reach the client event by event, never buffered.
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def _parse_accept_encoding(value: str) -> set:
+    accepted = set()
+    for part in value.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+class _StreamCompressor:
+    """Incremental compressor; output is emitted as its buffers fill up."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """gzip/brotli compression of responses above a size threshold.
+
+    Complete bodies are compressed in one go; streamed bodies (such as the
+    NDJSON export) are compressed chunk by chunk. SSE is passed through
+    untouched so events are not held back by the compressor.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        brotli_enabled: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled and brotli is not None
+
+    def _choose_encoding(self, scope):
+        accepted = _parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if self.brotli_enabled and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                chunk = compressor.compress(body)
+                if not more_body:
+                    chunk += compressor.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if not more_body:
+                if len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send(message)
+                    return
+                body = self._compress(encoding, body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            compressor = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body),
+                "more_body": True,
+            })
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class CacheControlMiddleware:
+    """Caching policy for /api responses that do not set their own.
+
+    Reads may be stored by the browser but must be revalidated on every
+    use (`no-cache`), which leaves room for ETag/Last-Modified validation.
+    Responses differ per household, hence `private` and `Vary` on the
+    access key header. Everything else is `no-store`.
+    """
+
+    def __init__(self, app, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        is_read = scope["method"] in ("GET", "HEAD")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if "cache-control" not in headers:
+                    if is_read and message["status"] < 400:
+                        headers["Cache-Control"] = "private, no-cache"
+                    else:
+                        headers["Cache-Control"] = "no-store"
+                headers.add_vary_header("X-Access-Key")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
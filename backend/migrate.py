@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+CLI script to bring the database schema up to date.
+
+Usage:
+    python migrate.py [--status]
+
+Run it once per deploy, before restarting the backend. Application
+workers never create or alter tables themselves; on startup they only
+compare the version stored in `schema_version` with SCHEMA_VERSION.
+
+Every shard (see SHARD_URLS) has its own schema_version and is migrated
+in turn. To add a migration, append a new (version, description, function)
+entry to MIGRATIONS. Each function receives a connection inside the
+migration's transaction and the shard number, and should be safe to run
+against a schema that already has the change (databases created before
+versioning existed).
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, insert, select, update, func, text, literal, false
+
+from database import shard_engines
+from models import (
+    Base, HouseholdDirectory, Household, Product, ShoppingItem, PurchaseHistory,
+    ProductStats, SchemaVersion
+)
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    """Add a column unless it already exists."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_base_tables(conn, shard):
+    Base.metadata.create_all(bind=conn, tables=[
+        Household.__table__,
+        Product.__table__,
+        ShoppingItem.__table__,
+    ])
+
+
+def _add_products_is_new(conn, shard):
+    # Products that existed before this column are already ordered.
+    _add_column(conn, "products", "is_new", "BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+def _create_purchase_history(conn, shard):
+    Base.metadata.create_all(bind=conn, tables=[
+        PurchaseHistory.__table__,
+        ProductStats.__table__,
+    ])
+
+
+def _create_household_directory(conn, shard):
+    if shard != 0:
+        return
+    Base.metadata.create_all(bind=conn, tables=[HouseholdDirectory.__table__])
+    # Before sharding every household lived in the primary database.
+    conn.execute(
+        insert(HouseholdDirectory.__table__).from_select(
+            ["id", "access_key_hash", "shard", "is_moving"],
+            select(Household.id, Household.access_key_hash, literal(0), false()).where(
+                Household.id.notin_(select(HouseholdDirectory.id))
+            )
+        )
+    )
+
+
+def _add_directory_last_active(conn, shard):
+    if shard != 0:
+        return
+    _add_column(conn, "household_directory", "last_active_at", "DATETIME NULL")
+    for index in HouseholdDirectory.__table__.indexes:
+        if "last_active_at" in index.columns:
+            index.create(conn, checkfirst=True)
+    # Existing households get a full inactivity window from this deploy on.
+    conn.execute(
+        update(HouseholdDirectory.__table__)
+        .where(HouseholdDirectory.last_active_at.is_(None))
+        .values(last_active_at=datetime.utcnow())
+    )
+
+
+MIGRATIONS = [
+    (1, "create households, products and shopping_items", _create_base_tables),
+    (2, "add products.is_new", _add_products_is_new),
+    (3, "create purchase_history and product_stats", _create_purchase_history),
+    (4, "create household_directory", _create_household_directory),
+    (5, "add household_directory.last_active_at", _add_directory_last_active),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(bind) -> int:
+    """Return the stored schema version, 0 if the database is not versioned yet."""
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(SchemaVersion.__tablename__):
+            return 0
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def check_schema_version():
+    """Fail fast if any shard's schema does not match this code."""
+    for shard, bind in enumerate(shard_engines):
+        current = get_schema_version(bind)
+        if current != SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema of shard {shard} is at version {current}, "
+                f"expected {SCHEMA_VERSION}. "
+                "Run `python migrate.py` before starting the application."
+            )
+
+
+def run_migrations(bind, shard: int = 0, log=print) -> int:
+    """Apply pending migrations in order and return the number applied."""
+    SchemaVersion.__table__.create(bind=bind, checkfirst=True)
+    current = get_schema_version(bind)
+
+    applied = 0
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        started = time.perf_counter()
+        with bind.begin() as conn:
+            migration(conn, shard)
+            conn.execute(SchemaVersion.__table__.insert().values(
+                version=version,
+                description=description,
+            ))
+        log(f"Shard {shard}: applied {version}: {description} ({time.perf_counter() - started:.2f}s)")
+        applied += 1
+
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument(
+        "--status", "-s",
+        action="store_true",
+        help="Only show the stored and expected schema version"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            for shard, bind in enumerate(shard_engines):
+                print(f"Shard {shard} schema version: {get_schema_version(bind)}")
+            print(f"Expected schema version: {SCHEMA_VERSION}")
+            return
+
+        for shard, bind in enumerate(shard_engines):
+            if run_migrations(bind, shard):
+                print(f"Shard {shard} migrated to version {SCHEMA_VERSION}.")
+            else:
+                print(f"Shard {shard} already at version {SCHEMA_VERSION}, nothing to do.")
+
+    except Exception as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
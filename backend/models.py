@@ -1,10 +1,27 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
 
 
+
+class HouseholdDirectory(Base):
+    """Maps every household to its shard; lives in the primary database only.
+
+    Issues household ids and keeps access_key_hash unique across shards.
+    """
+    __tablename__ = "household_directory"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    access_key_hash = Column(String(128), unique=True, nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+    # Set while the household is copied to another shard; writes are refused.
+    is_moving = Column(Boolean, default=False, nullable=False)
+    # Refreshed at most once per shards.ACTIVITY_RESOLUTION; drives cleanup.
+    last_active_at = Column(DateTime, default=datetime.utcnow, nullable=True, index=True)
+
+
 class Household(Base):
     __tablename__ = "households"
 
@@ -46,3 +63,37 @@ class ShoppingItem(Base):
 
     household = relationship("Household", back_populates="shopping_items")
     product = relationship("Product", back_populates="shopping_items")
+
+
+class PurchaseHistory(Base):
+    """Append-only log of purchased items, written when the list is cleared."""
+    __tablename__ = "purchase_history"
+    __table_args__ = (
+        Index("ix_purchase_history_household_purchased", "household_id", "purchased_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
+    # No foreign key: history outlives deleted products, the name is kept instead.
+    product_id = Column(Integer, nullable=True)
+    name = Column(String(200), nullable=False)
+    purchased_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class ProductStats(Base):
+    """Per-household purchase rollup, updated incrementally on each clear."""
+    __tablename__ = "product_stats"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    purchase_count = Column(Integer, default=0, nullable=False)
+    first_purchased_at = Column(DateTime, nullable=False)
+    last_purchased_at = Column(DateTime, nullable=False)
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
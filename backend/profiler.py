@@ -0,0 +1,161 @@
+"""Opt-in sampling profiler for the running worker.
+
+A background thread snapshots the stacks of all other threads at a fixed
+interval for a bounded window. Only samples taken while a route handler
+is on the stack are kept; each is recorded as a collapsed stack rooted at
+the route ("GET /api/products;routes/products.py:get_products;...") so
+the output can be fed straight to flamegraph.pl or speedscope. Nothing
+runs, and nothing is hooked, unless a profile was started.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi.routing import APIRoute
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Unique stacks kept per profile; further new stacks are counted as truncated.
+MAX_STACKS = 20000
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(BACKEND_DIR):
+        path = os.path.relpath(path, BACKEND_DIR)
+    return f"{path}:{code.co_name}"
+
+
+def route_codes(routes) -> Dict[object, str]:
+    """Map handler code objects to "METHOD /path" labels."""
+    codes = {}
+    for route in routes:
+        if isinstance(route, APIRoute):
+            methods = ",".join(sorted(route.methods))
+            codes[route.endpoint.__code__] = f"{methods} {route.path}"
+    return codes
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[datetime] = None
+        self.duration = 0.0
+        self.interval = 0.0
+        self.stacks: Counter = Counter()
+        self.routes: Dict[str, Dict[str, int]] = {}
+        self.samples = 0
+        self.truncated = 0
+        self.output_path: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, routes, duration: float, interval: float, output_dir: str = "") -> bool:
+        """Start a profile in the background; False if one is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.started_at = datetime.utcnow()
+            self.duration = duration
+            self.interval = interval
+            self.stacks = Counter()
+            self.routes = {}
+            self.samples = 0
+            self.truncated = 0
+            self.output_path = None
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(route_codes(routes), output_dir),
+                name="zakupomat-profiler",
+                daemon=True,
+            )
+            self._thread.start()
+            return True
+
+    def _run(self, codes: Dict[object, str], output_dir: str):
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(frame, codes)
+            time.sleep(self.interval)
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            name = f"profile-{self.started_at:%Y%m%d-%H%M%S}.collapsed"
+            path = os.path.join(output_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.collapsed())
+            self.output_path = path
+
+    def _sample(self, frame, codes: Dict[object, str]):
+        inner = []
+        route = None
+        while frame is not None:
+            code = frame.f_code
+            if code in codes:
+                route = codes[code]
+                inner.append(code)
+                break
+            inner.append(code)
+            frame = frame.f_back
+        if route is None:
+            return
+
+        in_sqlalchemy = any(
+            "sqlalchemy" + os.sep in code.co_filename for code in inner
+        )
+        summary = self.routes.setdefault(route, {"samples": 0, "sqlalchemy": 0})
+        summary["samples"] += 1
+        if in_sqlalchemy:
+            summary["sqlalchemy"] += 1
+        self.samples += 1
+
+        stack = ";".join([route] + [_label(code) for code in reversed(inner)])
+        if stack in self.stacks or len(self.stacks) < MAX_STACKS:
+            self.stacks[stack] += 1
+        else:
+            self.truncated += 1
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text: one "frame;frame;frame count" line per stack."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def status(self) -> dict:
+        ms_per_sample = self.interval * 1000
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "interval_ms": ms_per_sample,
+            "samples": self.samples,
+            "truncated": self.truncated,
+            "output_path": self.output_path,
+            # Approximate wall time per route, and how much of it was in SQLAlchemy
+            "routes": {
+                route: {
+                    "ms": round(summary["samples"] * ms_per_sample, 1),
+                    "sqlalchemy_ms": round(summary["sqlalchemy"] * ms_per_sample, 1),
+                }
+                for route, summary in sorted(
+                    self.routes.items(), key=lambda item: -item[1]["samples"]
+                )
+            },
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,146 @@
+"""In-process rate limiting and load shedding.
+
+Requests to /api are split into three classes (reads, writes and SSE
+connects), each with its own token-bucket budget. A request has to fit
+both the budget of its household (keyed by the access key, so no database
+lookup is needed) and the budget of its client IP. On top of that the
+number of requests in flight is capped globally. Everything lives in the
+worker's memory; with several workers each enforces its own limits.
+"""
+
+import hashlib
+import math
+import time
+from typing import Dict, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+# Buckets that refilled completely are forgotten once there are this many.
+MAX_TRACKED_KEYS = 10000
+
+# Never limited: the load balancer and monitoring must always get through.
+EXEMPT_PATHS = ("/api/health", "/api/metrics")
+
+stats = {
+    "allowed": 0,
+    "rate_limited": {"read": 0, "write": 0, "sse": 0},
+    "shed": 0,
+    "sse_streams_rejected": 0,
+    "in_flight": 0,
+}
+
+
+class TokenBucket:
+    """Token buckets sharing one rate and burst, one bucket per key."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def acquire(self, key: str, now: float) -> float:
+        """Take a token; return 0 on success, else seconds until one is available."""
+        tokens, last = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            return 0.0
+        self.buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    def prune(self, now: float):
+        if len(self.buckets) <= MAX_TRACKED_KEYS:
+            return
+        full_after = self.burst / self.rate
+        self.buckets = {
+            key: (tokens, last)
+            for key, (tokens, last) in self.buckets.items()
+            if now - last < full_after
+        }
+
+
+def _too_many(detail: str, status_code: int, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        read_per_second: float,
+        read_burst: int,
+        write_per_second: float,
+        write_burst: int,
+        sse_per_second: float,
+        sse_burst: int,
+        max_in_flight: int,
+        prefix: str = "/api",
+    ):
+        self.app = app
+        self.prefix = prefix
+        self.max_in_flight = max_in_flight
+        self.buckets = {
+            "read": TokenBucket(read_per_second, read_burst),
+            "write": TokenBucket(write_per_second, write_burst),
+            "sse": TokenBucket(sse_per_second, sse_burst),
+        }
+
+    def _request_class(self, scope) -> str:
+        if scope["path"] == f"{self.prefix}/sse":
+            return "sse"
+        if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return "read"
+        return "write"
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not path.startswith(self.prefix)
+            or path in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request_class = self._request_class(scope)
+        bucket = self.buckets[request_class]
+        now = time.monotonic()
+
+        access_key = Headers(scope=scope).get("x-access-key")
+        keys = [f"ip:{scope['client'][0]}" if scope.get("client") else "ip:unknown"]
+        if access_key:
+            keys.append("hh:" + hashlib.sha256(access_key.encode()).hexdigest())
+
+        wait = 0.0
+        for key in keys:
+            wait = bucket.acquire(key, now)
+            if wait:
+                break
+        bucket.prune(now)
+        if wait:
+            stats["rate_limited"][request_class] += 1
+            await _too_many("Too many requests", 429, wait)(scope, receive, send)
+            return
+
+        # SSE streams are long-lived and capped per household instead.
+        if request_class == "sse":
+            stats["allowed"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        if stats["in_flight"] >= self.max_in_flight:
+            stats["shed"] += 1
+            await _too_many("Server busy, retry shortly", 503, 1)(scope, receive, send)
+            return
+
+        stats["allowed"] += 1
+        stats["in_flight"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats["in_flight"] -= 1
@@ -0,0 +1,44 @@
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from profiler import profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: str = Header("", alias="X-Admin-Token")):
+    # Admin endpoints do not exist unless a token is configured.
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post("/profile", dependencies=[Depends(require_admin)])
+def start_profile(
+    request: Request,
+    seconds: float = Query(
+        settings.profile_duration_seconds, gt=0, le=settings.profile_max_duration_seconds
+    ),
+):
+    started = profiler.start(
+        request.app.routes,
+        duration=seconds,
+        interval=settings.profile_interval_ms / 1000,
+        output_dir=settings.profile_output_dir,
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return profiler.status()
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+def get_profile():
+    return profiler.status()
+
+
+@router.get("/profile/collapsed", dependencies=[Depends(require_admin)])
+def get_profile_collapsed():
+    return PlainTextResponse(profiler.collapsed())
@@ -1,13 +1,14 @@
 import hashlib
 import secrets
 import string
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from sqlalchemy.orm import Session
 
-from database import get_db
-from models import Household, Product
+from database import shard_sessions
+from models import Household, HouseholdDirectory
 from schemas import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse
 from default_products import DEFAULT_PRODUCTS
+from shards import resolve, create_household
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -16,26 +17,61 @@ def hash_key(key: str) -> str:
     return hashlib.sha256(key.encode()).hexdigest()
 
 
+def get_household_entry(
+    x_access_key: str = Header(..., alias="X-Access-Key")
+) -> HouseholdDirectory:
+    """Resolve the access key to a household id and shard, once per request."""
+    entry = resolve(hash_key(x_access_key))
+    if not entry:
+        raise HTTPException(status_code=401, detail="Invalid access key")
+    return entry
+
+
+def get_household_db(
+    request: Request,
+    entry: HouseholdDirectory = Depends(get_household_entry)
+):
+    """Session bound to the shard that holds the current household."""
+    if entry.is_moving and request.method not in ("GET", "HEAD"):
+        raise HTTPException(
+            status_code=503,
+            detail="Household is being moved, retry shortly",
+            headers={"Retry-After": "2"},
+        )
+    db = shard_sessions[entry.shard]()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_current_household(
-    x_access_key: str = Header(..., alias="X-Access-Key"),
-    db: Session = Depends(get_db)
+    entry: HouseholdDirectory = Depends(get_household_entry),
+    db: Session = Depends(get_household_db)
 ) -> Household:
-    key_hash = hash_key(x_access_key)
-    household = db.query(Household).filter(Household.access_key_hash == key_hash).first()
+    household = db.get(Household, entry.id)
     if not household:
-        raise HTTPException(status_code=401, detail="Invalid access key")
+        # The directory was switched to another shard after our lookup.
+        raise HTTPException(
+            status_code=503,
+            detail="Household is being moved, retry shortly",
+            headers={"Retry-After": "2"},
+        )
     return household
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    key_hash = hash_key(request.access_key)
-    household = db.query(Household).filter(Household.access_key_hash == key_hash).first()
+def login(request: LoginRequest):
+    entry = resolve(hash_key(request.access_key))
 
-    if not household:
+    if not entry:
         return LoginResponse(success=False)
 
-    return LoginResponse(success=True, household_name=household.name)
+    with shard_sessions[entry.shard]() as shard_db:
+        household = shard_db.get(Household, entry.id)
+        if not household:
+            return LoginResponse(success=False)
+        return LoginResponse(success=True, household_name=household.name)
 
 
 def generate_key(length: int = 12) -> str:
@@ -44,30 +80,12 @@ def generate_key(length: int = 12) -> str:
 
 
 @router.post("/register", response_model=RegisterResponse)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
+def register(request: RegisterRequest):
     name = request.name.strip()
     if not name:
         raise HTTPException(status_code=400, detail="Nazwa rodziny nie może być pusta")
 
     access_key = generate_key()
-    key_hash = hash_key(access_key)
-
-    household = Household(
-        access_key_hash=key_hash,
-        name=name,
-    )
-    db.add(household)
-    db.flush()
-
-    for idx, product_name in enumerate(DEFAULT_PRODUCTS, start=1):
-        product = Product(
-            household_id=household.id,
-            name=product_name,
-            sort_order=idx,
-            is_new=False,
-        )
-        db.add(product)
-
-    db.commit()
+    create_household(name, hash_key(access_key), DEFAULT_PRODUCTS)
 
     return RegisterResponse(access_key=access_key, household_name=name)
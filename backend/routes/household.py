@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from database import shard_engines
+from models import HouseholdDirectory
+from routes.auth import get_household_entry
+from transfer import export_household
+
+router = APIRouter(prefix="/household", tags=["household"])
+
+
+@router.get("/export")
+def export(entry: HouseholdDirectory = Depends(get_household_entry)):
+    # The generator opens its own connection: request-scoped sessions are
+    # closed before a streaming body is sent.
+    return StreamingResponse(
+        export_household(shard_engines[entry.shard], entry.id),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="zakupomat-{entry.id}.ndjson"'
+        },
+    )
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from database import get_db
-from models import Household, Product, ShoppingItem
-from schemas import ProductCreate, ProductUpdate, ProductResponse, ProductReorderRequest
-from routes.auth import get_current_household
-from routes.sse import notify_change
+from models import Household, HouseholdDirectory, Product, ShoppingItem, ProductStats
+from schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductReorderRequest,
+    ProductSuggestionResponse
+)
+import state
+from config import settings
+from history import get_suggestions
+from routes.auth import get_current_household, get_household_db, get_household_entry
+from routes.sse import queue_change
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -14,19 +19,32 @@ router = APIRouter(prefix="/products", tags=["products"])
 @router.get("", response_model=list[ProductResponse])
 def get_products(
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    entry: HouseholdDirectory = Depends(get_household_entry),
+    db: Session = Depends(get_household_db)
 ):
+    if settings.state_cache_enabled:
+        return state.cache.products(db, household.id, entry.shard)
+
     products = db.query(Product).filter(
         Product.household_id == household.id
     ).order_by(Product.sort_order).all()
     return products
 
 
+@router.get("/suggestions", response_model=list[ProductSuggestionResponse])
+def get_product_suggestions(
+    limit: int = Query(10, ge=1, le=50),
+    household: Household = Depends(get_current_household),
+    db: Session = Depends(get_household_db)
+):
+    return get_suggestions(db, household.id, limit)
+
+
 @router.post("", response_model=ProductResponse)
-async def create_product(
+def create_product(
     product: ProductCreate,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     existing = db.query(Product).filter(
         Product.household_id == household.id,
@@ -45,18 +63,19 @@ async def create_product(
         sort_order=max_order + 1
     )
     db.add(db_product)
+    state.mark_stale(db, household.id, products=True)
+    queue_change(db, household.id, "products_updated")
     db.commit()
     db.refresh(db_product)
 
-    await notify_change(household.id, "products_updated")
     return db_product
 
 
 @router.put("/reorder", response_model=list[ProductResponse])
-async def reorder_products(
+def reorder_products(
     request: ProductReorderRequest,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     products = db.query(Product).filter(
         Product.household_id == household.id,
@@ -72,22 +91,23 @@ async def reorder_products(
     if request.moved_product_id and request.moved_product_id in product_map:
         product_map[request.moved_product_id].is_new = False
 
+    state.mark_stale(db, household.id, products=True)
+    queue_change(db, household.id, "products_updated")
     db.commit()
 
     updated = db.query(Product).filter(
         Product.household_id == household.id
     ).order_by(Product.sort_order).all()
 
-    await notify_change(household.id, "products_updated")
     return updated
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-async def update_product(
+def update_product(
     product_id: int,
     product: ProductUpdate,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     db_product = db.query(Product).filter(
         Product.id == product_id,
@@ -106,18 +126,19 @@ async def update_product(
             raise HTTPException(status_code=400, detail="Product with this name already exists")
         db_product.name = product.name
 
+    state.mark_stale(db, household.id, products=True)
+    queue_change(db, household.id, "products_updated")
     db.commit()
     db.refresh(db_product)
 
-    await notify_change(household.id, "products_updated")
     return db_product
 
 
 @router.delete("/{product_id}")
-async def delete_product(
+def delete_product(
     product_id: int,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     db_product = db.query(Product).filter(
         Product.id == product_id,
@@ -135,8 +156,13 @@ async def delete_product(
             detail="Cannot delete product that is on shopping list"
         )
 
+    db.query(ProductStats).filter(
+        ProductStats.household_id == household.id,
+        ProductStats.product_id == product_id
+    ).delete(synchronize_session=False)
     db.delete(db_product)
+    state.mark_stale(db, household.id, products=True)
+    queue_change(db, household.id, "products_updated")
     db.commit()
 
-    await notify_change(household.id, "products_updated")
     return {"success": True}
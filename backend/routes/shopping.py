@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, update
 
-from database import get_db
-from models import Household, Product, ShoppingItem
+from models import Household, HouseholdDirectory, Product, ShoppingItem
 from schemas import (
     ShoppingItemCreate, ShoppingItemUpdate, ShoppingItemResponse,
-    ShoppingItemCheckRequest, ShoppingClearRequest
+    ShoppingItemCheckRequest, ShoppingBatchCheckRequest, ShoppingBatchCheckResponse,
+    ShoppingClearRequest
 )
-from routes.auth import get_current_household
-from routes.sse import notify_change
+import state
+from config import settings
+from history import record_purchases
+from routes.auth import get_current_household, get_household_db, get_household_entry
+from routes.sse import queue_change
 
 router = APIRouter(prefix="/shopping", tags=["shopping"])
 
@@ -32,8 +35,12 @@ def item_to_response(item: ShoppingItem) -> ShoppingItemResponse:
 @router.get("", response_model=list[ShoppingItemResponse])
 def get_shopping_list(
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    entry: HouseholdDirectory = Depends(get_household_entry),
+    db: Session = Depends(get_household_db)
 ):
+    if settings.state_cache_enabled:
+        return state.cache.shopping(db, household.id, entry.shard)
+
     items = db.query(ShoppingItem).filter(
         ShoppingItem.household_id == household.id
     ).all()
@@ -42,10 +49,10 @@ def get_shopping_list(
 
 
 @router.post("", response_model=ShoppingItemResponse)
-async def add_to_shopping_list(
+def add_to_shopping_list(
     item: ShoppingItemCreate,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     product_id = item.product_id
     products_updated = False
@@ -103,21 +110,54 @@ async def add_to_shopping_list(
     )
 
     db.add(db_item)
+    state.mark_stale(db, household.id, products=products_updated, shopping=True)
+    if products_updated:
+        queue_change(db, household.id, "products_updated")
+    queue_change(db, household.id, "shopping_updated")
     db.commit()
     db.refresh(db_item)
 
-    if products_updated:
-        await notify_change(household.id, "products_updated")
-    await notify_change(household.id, "shopping_updated")
     return item_to_response(db_item)
 
 
+# Declared before /{item_id} so "check" is not parsed as an item id.
+@router.put("/check", response_model=ShoppingBatchCheckResponse)
+def check_items(
+    request: ShoppingBatchCheckRequest,
+    household: Household = Depends(get_current_household),
+    db: Session = Depends(get_household_db)
+):
+    # Last state wins when the same item was tapped several times.
+    states = {entry.id: entry.is_checked for entry in request.items}
+
+    updated = 0
+    for is_checked in (True, False):
+        ids = [item_id for item_id, state in states.items() if state == is_checked]
+        if not ids:
+            continue
+        result = db.execute(
+            update(ShoppingItem)
+            .where(
+                ShoppingItem.household_id == household.id,
+                ShoppingItem.id.in_(ids)
+            )
+            .values(is_checked=is_checked)
+        )
+        updated += result.rowcount
+    if updated:
+        state.patch_checked(db, household.id, states)
+        queue_change(db, household.id, "shopping_updated")
+    db.commit()
+
+    return ShoppingBatchCheckResponse(updated=updated)
+
+
 @router.put("/{item_id}", response_model=ShoppingItemResponse)
-async def update_shopping_item(
+def update_shopping_item(
     item_id: int,
     item: ShoppingItemUpdate,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     db_item = db.query(ShoppingItem).filter(
         ShoppingItem.id == item_id,
@@ -131,18 +171,19 @@ async def update_shopping_item(
     if item.note is not None:
         db_item.note = item.note
 
+    state.mark_stale(db, household.id, shopping=True)
+    queue_change(db, household.id, "shopping_updated")
     db.commit()
     db.refresh(db_item)
 
-    await notify_change(household.id, "shopping_updated")
     return item_to_response(db_item)
 
 
 @router.delete("/{item_id}")
-async def remove_from_shopping_list(
+def remove_from_shopping_list(
     item_id: int,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     db_item = db.query(ShoppingItem).filter(
         ShoppingItem.id == item_id,
@@ -152,18 +193,19 @@ async def remove_from_shopping_list(
         raise HTTPException(status_code=404, detail="Item not found")
 
     db.delete(db_item)
+    state.mark_stale(db, household.id, shopping=True)
+    queue_change(db, household.id, "shopping_updated")
     db.commit()
 
-    await notify_change(household.id, "shopping_updated")
     return {"success": True}
 
 
 @router.put("/{item_id}/check", response_model=ShoppingItemResponse)
-async def check_item(
+def check_item(
     item_id: int,
     request: ShoppingItemCheckRequest,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     db_item = db.query(ShoppingItem).filter(
         ShoppingItem.id == item_id,
@@ -173,26 +215,35 @@ async def check_item(
         raise HTTPException(status_code=404, detail="Item not found")
 
     db_item.is_checked = request.is_checked
+    state.patch_checked(db, household.id, {item_id: request.is_checked})
+    queue_change(db, household.id, "shopping_updated")
     db.commit()
     db.refresh(db_item)
 
-    await notify_change(household.id, "shopping_updated")
     return item_to_response(db_item)
 
 
 @router.post("/clear")
-async def clear_shopping_list(
+def clear_shopping_list(
     request: ShoppingClearRequest,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     query = db.query(ShoppingItem).filter(ShoppingItem.household_id == household.id)
 
+    # Locked so a concurrent clear waits and then no longer sees these items,
+    # instead of recording the same purchases twice.
+    checked = query.filter(ShoppingItem.is_checked == True).options(
+        selectinload(ShoppingItem.product)
+    ).with_for_update().all()
+    record_purchases(db, household.id, checked)
+
     if request.keep_unchecked:
         query = query.filter(ShoppingItem.is_checked == True)
 
     query.delete(synchronize_session=False)
+    state.mark_stale(db, household.id, shopping=True)
+    queue_change(db, household.id, "shopping_updated")
     db.commit()
 
-    await notify_change(household.id, "shopping_updated")
     return {"success": True}
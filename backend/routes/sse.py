@@ -1,13 +1,15 @@
 import asyncio
 import json
 from typing import Dict, List, Optional
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sse_starlette.sse import EventSourceResponse
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from database import get_db
+from config import settings
 from models import Household
-from routes.auth import get_current_household
+from ratelimit import stats as limit_stats
+from routes.auth import get_current_household, get_household_db
 
 router = APIRouter(tags=["sse"])
 
@@ -15,32 +17,124 @@ router = APIRouter(tags=["sse"])
 connections: Dict[int, List[asyncio.Queue]] = {}
 
 
-async def notify_change(household_id: int, event_type: str, data: Optional[dict] = None):
-    """Notify all connected clients of a household about a change."""
-    if household_id not in connections:
+class EventDispatcher:
+    """Fans change events out to SSE subscribers off the request path.
+
+    `publish` may be called from any thread (sync handlers run in the
+    threadpool); events are handed to the event loop and pushed into
+    subscriber queues by a background task. Both the dispatch buffer and
+    each subscriber queue are bounded: when full, events are dropped and
+    counted rather than blocking a request.
+    """
+
+    def __init__(self, buffer_size: int, client_buffer_size: int):
+        self.buffer_size = buffer_size
+        self.client_buffer_size = client_buffer_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.dropped_client = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.buffer_size)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.loop = self.queue = self.task = None
+
+    def publish(self, household_id: int, message: str):
+        # Not started (CLI scripts): there is nobody to notify in this process.
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._enqueue, household_id, message)
+
+    def _enqueue(self, household_id: int, message: str):
+        try:
+            self.queue.put_nowait((household_id, message))
+            self.published += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            household_id, message = await self.queue.get()
+            for queue in list(connections.get(household_id, ())):
+                try:
+                    queue.put_nowait(message)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    self.dropped_client += 1
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "dropped_client": self.dropped_client,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "subscribers": sum(len(queues) for queues in connections.values()),
+        }
+
+
+dispatcher = EventDispatcher(settings.event_buffer_size, settings.sse_client_buffer_size)
+
+
+def queue_change(db: Session, household_id: int, event_type: str, data: Optional[dict] = None):
+    """Notify the household's clients once the session's transaction commits.
+
+    Nothing is sent if the transaction is rolled back. Repeated events of the
+    same type for the same household within one transaction are sent once.
+    """
+    db.info.setdefault("pending_events", {})[(household_id, event_type)] = data or {}
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session):
+    pending = session.info.pop("pending_events", None)
+    if not pending:
         return
+    for (household_id, event_type), data in pending.items():
+        dispatcher.publish(household_id, json.dumps({
+            "type": event_type,
+            "data": data
+        }))
 
-    message = json.dumps({
-        "type": event_type,
-        "data": data or {}
-    })
 
-    for queue in connections[household_id]:
-        await queue.put(message)
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop("pending_events", None)
 
 
 @router.get("/sse")
 async def sse_endpoint(
     request: Request,
     household: Household = Depends(get_current_household),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_household_db)
 ):
     household_id = household.id
 
+    if len(connections.get(household_id, ())) >= settings.sse_max_streams_per_household:
+        limit_stats["sse_streams_rejected"] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too many open streams for this household",
+            headers={"Retry-After": "30"},
+        )
+
     if household_id not in connections:
         connections[household_id] = []
 
-    queue: asyncio.Queue = asyncio.Queue()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=dispatcher.client_buffer_size)
     connections[household_id].append(queue)
 
     async def event_generator():
@@ -45,6 +45,14 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+class ProductSuggestionResponse(BaseModel):
+    id: int
+    name: str
+    sort_order: int
+    purchase_count: int
+    last_purchased_at: datetime
+
+
 class ProductReorderRequest(BaseModel):
     product_ids: List[int]
     moved_product_id: Optional[int] = None
@@ -83,6 +91,19 @@ class ShoppingItemCheckRequest(BaseModel):
     is_checked: bool
 
 
+class ShoppingItemCheckState(BaseModel):
+    id: int
+    is_checked: bool
+
+
+class ShoppingBatchCheckRequest(BaseModel):
+    items: List[ShoppingItemCheckState]
+
+
+class ShoppingBatchCheckResponse(BaseModel):
+    updated: int
+
+
 class ShoppingClearRequest(BaseModel):
     keep_unchecked: bool = False
 
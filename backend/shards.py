@@ -0,0 +1,308 @@
+"""Routing of households to database shards.
+
+Every table except the directory is partitioned by household_id, so a
+household lives entirely in one shard. The household_directory table in
+the primary database issues household ids, records each household's
+shard and keeps access_key_hash unique across all of them.
+"""
+
+import json
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, shard_engines, shard_sessions
+from models import HouseholdDirectory, Household, Product
+from transfer import (
+    export_household, import_household as import_into_shard, delete_household,
+    delete_households, count_rows
+)
+
+# last_active_at is written at most this often per household, so tracking
+# activity costs one UPDATE per active household per hour, not per request.
+ACTIVITY_RESOLUTION = timedelta(hours=1)
+
+
+def lookup(db: Session, key_hash: str) -> Optional[HouseholdDirectory]:
+    return db.query(HouseholdDirectory).filter(
+        HouseholdDirectory.access_key_hash == key_hash
+    ).first()
+
+
+def touch(db: Session, entry: HouseholdDirectory):
+    """Record that the household is in use, unless that was done recently."""
+    now = datetime.utcnow()
+    if entry.last_active_at is not None and now - entry.last_active_at < ACTIVITY_RESOLUTION:
+        return
+    entry.last_active_at = now
+    db.commit()
+
+
+def resolve(key_hash: str) -> Optional[HouseholdDirectory]:
+    """Look up and touch a directory entry in a short session of its own.
+
+    The entry is returned detached, so the primary connection goes back to
+    the pool before the request opens its shard session (shard 0 shares
+    that pool).
+    """
+    with SessionLocal(expire_on_commit=False) as db:
+        entry = lookup(db, key_hash)
+        if entry is not None:
+            touch(db, entry)
+            db.expunge(entry)
+        return entry
+
+
+def get_entry(household_id: int) -> HouseholdDirectory:
+    with SessionLocal() as db:
+        entry = db.get(HouseholdDirectory, household_id)
+        if entry is None:
+            raise ValueError(f"Household {household_id} not found")
+        db.expunge(entry)
+        return entry
+
+
+def _reserve(key_hash: str) -> HouseholdDirectory:
+    """Claim an id and access key for a new household and place it on a shard."""
+    with SessionLocal() as db:
+        entry = HouseholdDirectory(access_key_hash=key_hash, shard=0)
+        db.add(entry)
+        try:
+            db.flush()
+        except IntegrityError:
+            raise ValueError("A household with this access key already exists")
+        entry.shard = entry.id % len(shard_engines)
+        db.commit()
+        db.refresh(entry)
+        db.expunge(entry)
+        return entry
+
+
+def _release(household_id: int):
+    with SessionLocal() as db:
+        db.query(HouseholdDirectory).filter(
+            HouseholdDirectory.id == household_id
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+def create_household(name: Optional[str], key_hash: str, product_names: List[str]) -> int:
+    """Register a household in the directory and create it on its shard."""
+    entry = _reserve(key_hash)
+    try:
+        with shard_sessions[entry.shard]() as db:
+            db.add(Household(id=entry.id, access_key_hash=key_hash, name=name))
+            db.flush()
+            db.add_all(
+                Product(
+                    household_id=entry.id,
+                    name=product_name,
+                    sort_order=idx,
+                    is_new=False,
+                )
+                for idx, product_name in enumerate(product_names, start=1)
+            )
+            db.commit()
+    except Exception:
+        _release(entry.id)
+        raise
+    return entry.id
+
+
+def import_household(lines: Iterable[str], access_key_hash: Optional[str] = None) -> int:
+    """Import an NDJSON export as a new household on the shard the directory picks."""
+    lines = iter(lines)
+    first = next(lines, "")
+    header = json.loads(first) if first.strip() else {}
+    if header.get("type") != "household":
+        raise ValueError("Export must start with a household record")
+
+    key_hash = access_key_hash or header["access_key_hash"]
+    entry = _reserve(key_hash)
+    try:
+        import_into_shard(
+            shard_engines[entry.shard],
+            chain([first], lines),
+            access_key_hash=key_hash,
+            household_id=entry.id,
+        )
+    except Exception:
+        _release(entry.id)
+        raise
+    return entry.id
+
+
+def move_household(household_id: int, target: int, grace_seconds: float = 2.0, log=print):
+    """Move a household to another shard while the app is running.
+
+    Writes are refused (503) while the household is flagged as moving.
+    After a short grace period for requests already in flight, its rows are
+    streamed from the source shard into the target, the directory is
+    switched over, and the source copy is bulk-deleted. Row ids are issued
+    by each shard, so products and list items get new ids in the target.
+    """
+    if not 0 <= target < len(shard_engines):
+        raise ValueError(f"Shard {target} is not configured")
+
+    with SessionLocal() as directory:
+        entry = directory.get(HouseholdDirectory, household_id)
+        if entry is None:
+            raise ValueError(f"Household {household_id} not found")
+        if entry.shard == target:
+            raise ValueError(f"Household {household_id} is already on shard {target}")
+        if entry.is_moving:
+            raise ValueError(f"Household {household_id} is already being moved")
+
+        source = entry.shard
+        entry.is_moving = True
+        directory.commit()
+
+        try:
+            time.sleep(grace_seconds)
+            started = time.perf_counter()
+            import_into_shard(
+                shard_engines[target],
+                export_household(shard_engines[source], household_id),
+                household_id=household_id,
+            )
+            entry.shard = target
+        finally:
+            entry.is_moving = False
+            directory.commit()
+
+    delete_household(shard_engines[source], household_id)
+    log(
+        f"Moved household {household_id} from shard {source} to shard {target} "
+        f"({time.perf_counter() - started:.2f}s)"
+    )
+
+
+def shard_counts() -> dict:
+    """Number of households per shard, from the directory."""
+    with SessionLocal() as db:
+        rows = db.query(
+            HouseholdDirectory.shard, func.count(HouseholdDirectory.id)
+        ).group_by(HouseholdDirectory.shard).all()
+    counts = {shard: 0 for shard in range(len(shard_engines))}
+    counts.update(dict(rows))
+    return counts
+
+
+def _inactive_batches(cutoff: datetime, batch_size: int) -> Iterator[list]:
+    """Yield (id, shard) rows of households idle since cutoff, in id order."""
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            rows = db.query(HouseholdDirectory.id, HouseholdDirectory.shard).filter(
+                HouseholdDirectory.id > last_id,
+                HouseholdDirectory.last_active_at < cutoff,
+                HouseholdDirectory.is_moving == False,
+            ).order_by(HouseholdDirectory.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _claim_inactive(household_ids: List[int], cutoff: datetime) -> List[tuple]:
+    """Remove directory entries that are still idle; returns the (id, shard) removed.
+
+    From here on the access keys no longer resolve, so the shard rows can be
+    deleted without racing requests. A household used since it was selected
+    keeps its entry.
+    """
+    with SessionLocal() as db:
+        rows = db.query(HouseholdDirectory.id, HouseholdDirectory.shard).filter(
+            HouseholdDirectory.id.in_(household_ids),
+            HouseholdDirectory.last_active_at < cutoff,
+            HouseholdDirectory.is_moving == False,
+        ).with_for_update().all()
+        if rows:
+            db.query(HouseholdDirectory).filter(
+                HouseholdDirectory.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+        db.commit()
+    return rows
+
+
+def purge_inactive(
+    days: int,
+    batch_size: int = 100,
+    pause: float = 0.5,
+    dry_run: bool = False,
+) -> Dict[int, Counter]:
+    """Delete households not used for `days` days, batch by batch.
+
+    Each batch is one short transaction on the directory and one per shard,
+    with bulk deletes only; `pause` seconds between batches keep the load
+    down. Returns per shard the number of households (and, in a dry run,
+    the rows per table) that were or would be removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    report = {shard: Counter() for shard in range(len(shard_engines))}
+
+    for batch in _inactive_batches(cutoff, batch_size):
+        if not dry_run:
+            batch = _claim_inactive([row.id for row in batch], cutoff)
+
+        by_shard: Dict[int, List[int]] = {}
+        for row in batch:
+            by_shard.setdefault(row.shard, []).append(row.id)
+
+        for shard, household_ids in by_shard.items():
+            if dry_run:
+                report[shard].update(count_rows(shard_engines[shard], household_ids))
+            else:
+                # Rows left behind if this fails are picked up by purge_orphans.
+                delete_households(shard_engines[shard], household_ids)
+                report[shard]["household"] += len(household_ids)
+
+        if not dry_run:
+            time.sleep(pause)
+    return report
+
+
+def _orphan_batches(shard: int, batch_size: int) -> Iterator[List[int]]:
+    """Yield ids of households stored on a shard the directory does not point to.
+
+    These are left over from interrupted moves or purges. Households being
+    moved are skipped, their copy on the target shard is still in progress.
+    """
+    last_id = 0
+    while True:
+        with shard_sessions[shard]() as db:
+            ids = [row.id for row in db.query(Household.id).filter(
+                Household.id > last_id
+            ).order_by(Household.id).limit(batch_size)]
+        if not ids:
+            return
+        last_id = ids[-1]
+
+        with SessionLocal() as directory:
+            placed = {row.id for row in directory.query(HouseholdDirectory.id).filter(
+                HouseholdDirectory.id.in_(ids),
+                or_(HouseholdDirectory.shard == shard, HouseholdDirectory.is_moving == True),
+            )}
+        orphans = [household_id for household_id in ids if household_id not in placed]
+        if orphans:
+            yield orphans
+
+
+def purge_orphans(batch_size: int = 100, pause: float = 0.5, dry_run: bool = False) -> Dict[int, Counter]:
+    """Delete shard data of households without a directory entry on that shard."""
+    report = {shard: Counter() for shard in range(len(shard_engines))}
+    for shard, bind in enumerate(shard_engines):
+        for household_ids in _orphan_batches(shard, batch_size):
+            if dry_run:
+                report[shard].update(count_rows(bind, household_ids))
+            else:
+                delete_households(bind, household_ids)
+                report[shard]["household"] += len(household_ids)
+                time.sleep(pause)
+    return report
@@ -0,0 +1,212 @@
+"""Streaming NDJSON export and import of a single household.
+
+The export is one JSON object per line: a `household` record first, then
+every household-scoped row grouped by table. Rows are read through
+server-side cursors and written back in chunks, so memory use depends on
+the chunk size and the number of products, not on the size of the export.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import DateTime, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import Household, Product, ShoppingItem, ProductStats, PurchaseHistory
+
+EXPORT_FORMAT = 1
+CHUNK_SIZE = 1000
+
+# Export order matters: products come first so their new ids are known
+# before anything that references them is imported.
+TABLES = [
+    ("product", Product),
+    ("shopping_item", ShoppingItem),
+    ("product_stats", ProductStats),
+    ("purchase", PurchaseHistory),
+]
+
+
+def _encode(kind: str, row) -> str:
+    data = {"type": kind}
+    for key, value in row.items():
+        if key == "household_id":
+            continue
+        data[key] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+def _decode(model, data: dict) -> dict:
+    """Keep known columns only and parse timestamps; drops the old primary key."""
+    row = {}
+    for column in model.__table__.columns:
+        if column.name not in data or column.name == "id":
+            continue
+        value = data[column.name]
+        if isinstance(column.type, DateTime) and value is not None:
+            value = datetime.fromisoformat(value)
+        row[column.name] = value
+    return row
+
+
+def export_household(bind, household_id: int) -> Iterator[str]:
+    """Yield NDJSON lines for one household."""
+    with bind.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=CHUNK_SIZE)
+
+        household = conn.execute(
+            select(Household.__table__).where(Household.id == household_id)
+        ).mappings().first()
+        if household is None:
+            raise ValueError(f"Household {household_id} not found")
+
+        yield _encode("household", {
+            "format": EXPORT_FORMAT,
+            "name": household["name"],
+            "access_key_hash": household["access_key_hash"],
+            "created_at": household["created_at"],
+        })
+
+        for kind, model in TABLES:
+            table = model.__table__
+            result = conn.execute(
+                select(table)
+                .where(table.c.household_id == household_id)
+                .order_by(*table.primary_key.columns)
+            )
+            for row in result.mappings():
+                yield _encode(kind, row)
+
+
+def import_household(
+    bind,
+    lines: Iterable[str],
+    access_key_hash: Optional[str] = None,
+    household_id: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Create a household from export lines and return its id.
+
+    Ids are remapped on the way in. `access_key_hash` replaces the exported
+    one, which is needed when cloning a household into the same instance.
+    `household_id` keeps the household id fixed (it is issued by the shard
+    directory); other ids are always new. Everything is committed in a
+    single transaction.
+    """
+    models = dict(TABLES)
+
+    with Session(bind) as db:
+        new_id = None
+        product_ids = {}
+        pending_products = []
+        pending_rows = {kind: [] for kind, _ in TABLES if kind != "product"}
+
+        def flush_products():
+            # One executemany per chunk; the new ids are read back by name,
+            # which is unique within a household.
+            db.execute(insert(Product), [row for _, row in pending_products])
+            old_ids = {row["name"]: old_id for old_id, row in pending_products}
+            for product_id, name in db.execute(
+                select(Product.id, Product.name).where(
+                    Product.household_id == new_id,
+                    Product.name.in_(list(old_ids))
+                )
+            ):
+                product_ids[old_ids[name]] = product_id
+            pending_products.clear()
+
+        def flush_rows(kind):
+            if pending_rows[kind]:
+                db.execute(insert(models[kind]), pending_rows[kind])
+                pending_rows[kind].clear()
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            kind = data.get("type")
+
+            if kind == "household":
+                if new_id is not None:
+                    raise ValueError("Export contains more than one household")
+                if data.get("format") != EXPORT_FORMAT:
+                    raise ValueError(f"Unsupported export format: {data.get('format')}")
+                key_hash = access_key_hash or data["access_key_hash"]
+                existing = db.query(Household.id).filter(
+                    Household.access_key_hash == key_hash
+                ).first()
+                if existing:
+                    raise ValueError("A household with this access key already exists")
+                household = Household(**_decode(Household, data))
+                household.access_key_hash = key_hash
+                if household_id is not None:
+                    household.id = household_id
+                db.add(household)
+                db.flush()
+                new_id = household.id
+                continue
+
+            if new_id is None:
+                raise ValueError("Export must start with a household record")
+            if kind not in models:
+                raise ValueError(f"Unknown record type: {kind}")
+
+            row = _decode(models[kind], data)
+            row["household_id"] = new_id
+
+            if kind == "product":
+                pending_products.append((data["id"], row))
+                if len(pending_products) >= chunk_size:
+                    flush_products()
+                continue
+
+            if pending_products:
+                flush_products()
+
+            if row.get("product_id") is not None:
+                row["product_id"] = product_ids.get(row["product_id"])
+            if kind == "product_stats" and row["product_id"] is None:
+                continue
+
+            pending_rows[kind].append(row)
+            if len(pending_rows[kind]) >= chunk_size:
+                flush_rows(kind)
+
+        if new_id is None:
+            raise ValueError("Export does not contain a household record")
+
+        if pending_products:
+            flush_products()
+        for kind in pending_rows:
+            flush_rows(kind)
+        db.commit()
+
+    return new_id
+
+
+def delete_household(bind, household_id: int):
+    """Remove a household and all its rows with one bulk DELETE per table."""
+    delete_households(bind, [household_id])
+
+
+def delete_households(bind, household_ids: List[int]):
+    """Remove several households in one transaction, one bulk DELETE per table."""
+    with bind.begin() as conn:
+        for _, model in reversed(TABLES):
+            table = model.__table__
+            conn.execute(delete(table).where(table.c.household_id.in_(household_ids)))
+        conn.execute(delete(Household.__table__).where(Household.id.in_(household_ids)))
+
+
+def count_rows(bind, household_ids: List[int]) -> Dict[str, int]:
+    """Rows per table that delete_households would remove."""
+    counts = {}
+    with bind.connect() as conn:
+        for name, model in [("household", Household)] + TABLES:
+            column = model.id if model is Household else model.__table__.c.household_id
+            counts[name] = conn.execute(
+                select(func.count()).select_from(model.__table__).where(column.in_(household_ids))
+            ).scalar_one()
+    return counts
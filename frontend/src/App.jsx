@@ -9,7 +9,7 @@ import { ShoppingMode } from './components/ShoppingMode';
 import { BulkAdd } from './components/BulkAdd';
 import { ProductManager } from './components/ProductManager';
 import { useSSE } from './hooks/useSSE';
-import { hasAccessKey, getProducts, getShoppingList, login, setAccessKey, getAccessKey } from './api/client';
+import { hasAccessKey, getProducts, getShoppingList, login, setAccessKey, getAccessKey, RESYNC_EVENT } from './api/client';
 
 import './styles/main.css';
 
@@ -47,6 +47,11 @@ function AppContent() {
 
   useSSE(isLoggedIn ? handleSSEUpdate : () => {});
 
+  useEffect(() => {
+    window.addEventListener(RESYNC_EVENT, fetchData);
+    return () => window.removeEventListener(RESYNC_EVENT, fetchData);
+  }, [fetchData]);
+
   // Handle automatic login from URL parameter
   useEffect(() => {
     const handleAutoLogin = async () => {
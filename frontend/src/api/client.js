@@ -1,5 +1,8 @@
 const API_BASE = '/api';
 
+// Fired when the local lists may be out of date and should be fetched again
+export const RESYNC_EVENT = 'zakupomat:resync';
+
 export function getAccessKey() {
   return localStorage.getItem('accessKey');
 }
@@ -39,6 +42,14 @@ async function request(endpoint, options = {}) {
     throw new Error('Unauthorized');
   }
 
+  // A change to an unknown id means our ids are stale (e.g. the household was
+  // moved to another database); a refused change may also be due to a move.
+  const method = options.method || 'GET';
+  if (method !== 'GET' && (response.status === 404 || response.status === 503)) {
+    const retryAfter = Number(response.headers.get('Retry-After')) || 0;
+    setTimeout(() => window.dispatchEvent(new Event(RESYNC_EVENT)), retryAfter * 1000);
+  }
+
   if (!response.ok) {
     const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
     throw new Error(error.detail || 'Request failed');
@@ -148,6 +159,22 @@ export async function checkShoppingItem(id, isChecked) {
   });
 }
 
+export async function checkShoppingItems(states) {
+  const items = Object.entries(states).map(([id, isChecked]) => ({
+    id: Number(id),
+    is_checked: isChecked,
+  }));
+  const result = await request('/shopping/check', {
+    method: 'PUT',
+    body: JSON.stringify({ items }),
+  });
+  // Unknown ids are skipped by the server: our list is out of date
+  if (result.updated < items.length) {
+    window.dispatchEvent(new Event(RESYNC_EVENT));
+  }
+  return result;
+}
+
 export async function clearShoppingList(keepUnchecked = false) {
   return request('/shopping/clear', {
     method: 'POST',
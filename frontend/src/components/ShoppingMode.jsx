@@ -1,10 +1,64 @@
-import { useState } from 'react';
-import { checkShoppingItem, clearShoppingList } from '../api/client';
+import { useState, useRef, useEffect, useCallback } from 'react';
+import { checkShoppingItems, clearShoppingList } from '../api/client';
+
+// Taps within this window after the first one are sent as one batch request
+const CHECK_FLUSH_DELAY_MS = 400;
 
 export function ShoppingMode({ shoppingItems, onRefresh }) {
   const [showClearModal, setShowClearModal] = useState(false);
+  // Locally toggled states not yet confirmed by a refetch: item id -> is_checked
+  const [localChecks, setLocalChecks] = useState({});
+  const pendingChecksRef = useRef({});
+  const flushTimeoutRef = useRef(null);
+
+  // Batches are sent one at a time, in tap order: each flush waits for the
+  // previous request, so a later tap can never be overwritten by an earlier one
+  const flushChainRef = useRef(Promise.resolve());
+
+  const sendPendingChecks = useCallback(async () => {
+    const states = pendingChecksRef.current;
+    pendingChecksRef.current = {};
+    if (Object.keys(states).length === 0) return;
+
+    try {
+      await checkShoppingItems(states);
+      await onRefresh();
+    } catch (err) {
+      alert('Blad: ' + err.message);
+    }
+
+    // Drop overrides the server now reflects, keep ones tapped again meanwhile
+    setLocalChecks(prev => {
+      const next = { ...prev };
+      for (const id of Object.keys(states)) {
+        if (!(id in pendingChecksRef.current)) {
+          delete next[id];
+        }
+      }
+      return next;
+    });
+  }, [onRefresh]);
 
-  const sortedItems = [...shoppingItems].sort((a, b) => {
+  const flushChecks = useCallback(() => {
+    flushTimeoutRef.current = null;
+    flushChainRef.current = flushChainRef.current.then(sendPendingChecks);
+    return flushChainRef.current;
+  }, [sendPendingChecks]);
+
+  useEffect(() => {
+    return () => {
+      if (flushTimeoutRef.current) {
+        clearTimeout(flushTimeoutRef.current);
+        flushChecks();
+      }
+    };
+  }, [flushChecks]);
+
+  const displayedItems = shoppingItems.map(item =>
+    item.id in localChecks ? { ...item, is_checked: localChecks[item.id] } : item
+  );
+
+  const sortedItems = [...displayedItems].sort((a, b) => {
     // Unchecked first
     if (a.is_checked !== b.is_checked) {
       return a.is_checked ? 1 : -1;
@@ -17,20 +71,26 @@ export function ShoppingMode({ shoppingItems, onRefresh }) {
     return (a.sort_order ?? 0) - (b.sort_order ?? 0);
   });
 
-  const checkedCount = shoppingItems.filter(i => i.is_checked).length;
-  const totalCount = shoppingItems.length;
+  const checkedCount = displayedItems.filter(i => i.is_checked).length;
+  const totalCount = displayedItems.length;
 
-  const handleCheck = async (item) => {
-    try {
-      await checkShoppingItem(item.id, !item.is_checked);
-      onRefresh();
-    } catch (err) {
-      alert('Blad: ' + err.message);
+  const handleCheck = (item) => {
+    const isChecked = !item.is_checked;
+    pendingChecksRef.current[item.id] = isChecked;
+    setLocalChecks(prev => ({ ...prev, [item.id]: isChecked }));
+
+    if (!flushTimeoutRef.current) {
+      flushTimeoutRef.current = setTimeout(flushChecks, CHECK_FLUSH_DELAY_MS);
     }
   };
 
   const handleClear = async (keepUnchecked) => {
     try {
+      if (flushTimeoutRef.current) {
+        clearTimeout(flushTimeoutRef.current);
+        flushChecks();
+      }
+      await flushChainRef.current;
       await clearShoppingList(keepUnchecked);
       setShowClearModal(false);
       onRefresh();
@@ -1,10 +1,26 @@
 import { useEffect, useRef, useCallback } from 'react';
 
+const RECONNECT_MIN_DELAY_MS = 3000;
+const RECONNECT_MAX_DELAY_MS = 60000;
+
 export function useSSE(onUpdate) {
   const eventSourceRef = useRef(null);
   const reconnectTimeoutRef = useRef(null);
+  const reconnectDelayRef = useRef(RECONNECT_MIN_DELAY_MS);
 
   const connect = useCallback(() => {
+    // Exponential backoff, or the server's Retry-After when it sends one
+    const scheduleReconnect = (retryAfterSeconds) => {
+      const delay = retryAfterSeconds
+        ? retryAfterSeconds * 1000
+        : reconnectDelayRef.current;
+      reconnectDelayRef.current = Math.min(
+        reconnectDelayRef.current * 2,
+        RECONNECT_MAX_DELAY_MS
+      );
+      reconnectTimeoutRef.current = setTimeout(connect, delay);
+    };
+
     const accessKey = localStorage.getItem('accessKey');
     if (!accessKey) return;
 
@@ -27,8 +43,18 @@ export function useSSE(onUpdate) {
         'Accept': 'text/event-stream',
       },
     }).then(response => {
+      if (response.status === 401) {
+        // Invalid key: retrying cannot help, the next API call logs out
+        return;
+      }
+      if (response.status === 429 || response.status === 503) {
+        scheduleReconnect(Number(response.headers.get('Retry-After')) || 0);
+        return;
+      }
       if (!response.ok) throw new Error('SSE connection failed');
 
+      reconnectDelayRef.current = RECONNECT_MIN_DELAY_MS;
+
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = '';
@@ -60,7 +86,7 @@ export function useSSE(onUpdate) {
         } catch (error) {
           console.error('SSE stream error:', error);
           // Reconnect after delay
-          reconnectTimeoutRef.current = setTimeout(connect, 3000);
+          scheduleReconnect();
         }
       };
 
@@ -68,7 +94,7 @@ export function useSSE(onUpdate) {
       processStream();
     }).catch(error => {
       console.error('SSE connection error:', error);
-      reconnectTimeoutRef.current = setTimeout(connect, 3000);
+      scheduleReconnect();
     });
   }, [onUpdate]);
 